@@ -1,11 +1,14 @@
 import argparse
-import re
+import ipaddress
 from datetime import datetime
 from typing import Any
 
 import requests
 from logger import log
 
+# Shared session so every command reuses the same keep-alive connection to the server
+session = requests.Session()
+
 parser = argparse.ArgumentParser(description="Process client command line arguments")
 
 parser.add_argument(
@@ -39,11 +42,12 @@ def is_valid_server_address(server_address):
     Returns:
         bool: Bool to indicate whether server_address is valid or not
     """
-    is_valid = re.fullmatch(
-        r"^\d{1,3}.\d{1,3}.\d{1,3}.\d{1,3}:\d{1,5}$",
-        server_address,
-    )
-    return bool(is_valid)
+    try:
+        host, port = server_address.rsplit(":", 1)
+        ipaddress.IPv4Address(host)
+    except ValueError:
+        return False
+    return port.isascii() and port.isdigit() and 0 < int(port) < 65536
 
 
 def main():
@@ -58,7 +62,7 @@ def main():
                 break
 
             if input_command.lower() == "report":
-                r = requests.get(url=base_url + "/report", timeout=30)
+                r = session.get(url=base_url + "/report", timeout=30)
                 if r.status_code == 200:
                     log.info(r.json())
                 else:
@@ -67,7 +71,7 @@ def main():
 
             command, arg = input_command.split(" ")
             if command.lower() == "add":
-                r = requests.post(url=base_url + f"/add_ticker/{arg}", timeout=30)
+                r = session.post(url=base_url + f"/add_ticker/{arg}", timeout=30)
                 if r.status_code == 200:
                     log.info(f"Added ticker {arg}")
                 elif r.status_code == 208:
@@ -77,7 +81,7 @@ def main():
                 continue
 
             if command.lower() == "delete":
-                r = requests.delete(url=base_url + f"/del_ticker/{arg}", timeout=30)
+                r = session.delete(url=base_url + f"/del_ticker/{arg}", timeout=30)
                 if r.status_code == 200:
                     log.info(f"Deleted ticker {arg}")
                 elif r.status_code == 404:
@@ -85,7 +89,7 @@ def main():
                 continue
 
             if command.lower() == "data":
-                r = requests.get(url=base_url + f"/data/{arg}", timeout=30)
+                r = session.get(url=base_url + f"/data/{arg}", timeout=30)
                 if r.status_code == 200:
                     data: dict[str, dict[str, Any]] = r.json()
                     for ticker in data:
@@ -105,7 +109,7 @@ if __name__ == "__main__":
     if args.server_address and is_valid_server_address(args.server_address):
         ip_address, port = args.server_address.split(":")
         base_url = get_base_url(ip_address=ip_address, port=port)
-        r = requests.get(url=base_url + "/", timeout=15)
+        r = session.get(url=base_url + "/", timeout=15)
         if r.status_code == 200:
             log.info(f"Connected to trading server at {base_url}")
     else:
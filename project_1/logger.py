@@ -4,6 +4,9 @@ from pathlib import Path
 
 import yaml
 
+# libyaml-backed loader when PyYAML was built with it, pure Python SafeLoader otherwise
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 class Logger:
     def get_logger(self) -> logging.Logger:
@@ -16,7 +19,7 @@ class Logger:
 
         if Path(log_config_path).exists():
             with Path.open(Path(log_config_path)) as f:
-                config_ = yaml.safe_load(f.read())
+                config_ = yaml.load(f, Loader=SafeLoader)
             config_["handlers"]["info_file_handler"]["filename"] = logfile
             logging.config.dictConfig(config_)
         else:
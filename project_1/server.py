@@ -1,21 +1,25 @@
 import argparse
 import atexit
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+import orjson
 import pandas as pd
-from flask import Flask
+from flask import Flask, make_response
 from flask_restful import Api, Resource
 from logger import log
 from utils import (
     add_ticker,
+    append_realtime_quote,
     calculate_avg_and_sigma,
     calculate_signal_and_pnl,
-    get_price,
+    get_price_and_signal,
     get_realtime_quote,
-    get_signal,
     save_report,
 )
 from waitress import serve
@@ -26,6 +30,13 @@ if not Path("data/").exists():
 if not Path("logs/").exists():
     Path("logs/").mkdir()
 
+# Historical data for each ticker on the server
+data: dict[str, pd.DataFrame] = {}
+
+# Latest data for each ticker, refreshed in the background and served to clients
+snapshot: dict[str, pd.DataFrame] = {}
+snapshot_lock = threading.Lock()
+
 
 # Classes for Flask-restful routes/endpoints
 class HomePage(Resource):
@@ -47,15 +58,13 @@ class Data(Resource):
 
         query_datetime: datetime = datetime.strptime(query_time, "%Y-%m-%d-%H:%M")
 
-        updated_data = get_latest_data()
+        updated_data = get_snapshot()
 
         result: dict[str, dict[str, Any]] = {}
 
         for ticker in updated_data:
-            result[ticker] = {
-                "price": get_price(updated_data[ticker], query_datetime),
-                "signal": get_signal(updated_data[ticker], query_datetime),
-            }
+            price, signal = get_price_and_signal(updated_data[ticker], query_datetime)
+            result[ticker] = {"price": price, "signal": signal}
         return result
 
 
@@ -63,7 +72,7 @@ class Report(Resource):
     def get(self):
         """Recreate report.csv with latest price, signal and pnl for each ticker"""
 
-        updated_data = get_latest_data()
+        updated_data = get_snapshot()
         save_report(updated_data)
         return "report.csv updated with latest data"
 
@@ -73,6 +82,8 @@ class DeleteTicker(Resource):
         ticker = ticker.upper()
         if ticker in data:
             del data[ticker]
+            with snapshot_lock:
+                snapshot.pop(ticker, None)
             return f"Deleted {ticker} from server data"
         return f"{ticker} not in server data", 404
 
@@ -83,12 +94,16 @@ class AddTicker(Resource):
         if ticker in data:
             return f"{ticker} already in server data", 208
 
-        data[ticker] = add_ticker(ticker, args.minutes)
-        if not data[ticker].empty:
-            return f"Added {ticker} to server data"
+        # only published once it is known to be valid, as refreshes read data concurrently
+        data_df = add_ticker(ticker, args.minutes)
+        if data_df.empty:
+            return f"Error adding {ticker} to server data", 400
 
-        del data[ticker]
-        return f"Error adding {ticker} to server data", 400
+        data[ticker] = data_df
+        # served from its history until the next snapshot refresh adds a live quote
+        with snapshot_lock:
+            snapshot[ticker] = data_df
+        return f"Added {ticker} to server data"
 
 
 def get_latest_data():
@@ -99,26 +114,80 @@ def get_latest_data():
         dict: A dictionary containing the latest data for each ticker.
     """
     result = {}
-    for ticker in data:
-        log.info("Getting realtime data for: %s", ticker)
+    frames = dict(data)
+    if not frames:
+        return result
+
+    # Quotes are fetched concurrently; the pandas recalculation stays on this thread
+    with ThreadPoolExecutor(max_workers=min(16, len(frames))) as executor:
+        futures = {}
+        for ticker in frames:
+            log.info("Getting realtime data for: %s", ticker)
+            futures[executor.submit(get_realtime_quote, ticker)] = ticker
+
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                realtime_quote = future.result()
+                # the derived columns are recalculated below, so only datetime and
+                # price are carried over from the existing data
+                data_df = append_realtime_quote(frames[ticker], realtime_quote)
+                data_df = calculate_avg_and_sigma(data_df, interval=args.minutes)
+                data_df = calculate_signal_and_pnl(data_df)
+            except Exception as e:
+                log.exception(f"Error getting realtime data for {ticker}: {e}")
+                continue
+            result[ticker] = data_df
+
+    return result
+
+
+def get_snapshot() -> dict[str, pd.DataFrame]:
+    """Returns a shallow copy of the latest data snapshot so it can be read without holding the lock
+
+    Returns:
+        dict[str, pd.DataFrame]: A dictionary containing the latest data for each ticker.
+    """
+    with snapshot_lock:
+        return dict(snapshot)
+
+
+def refresh_snapshot():
+    """Recomputes the latest data for every ticker and publishes it as the snapshot.
+    Tickers whose realtime quote could not be fetched keep their previous data.
+    """
+    latest = get_latest_data()
+    with snapshot_lock:
+        previous = dict(snapshot)
+        snapshot.clear()
+        for ticker, data_df in dict(data).items():
+            snapshot[ticker] = latest.get(ticker, previous.get(ticker, data_df))
+
+
+def snapshot_refresher():
+    """Refreshes the snapshot every X minutes. Runs on a daemon thread for the lifetime of the server."""
+    while True:
+        time.sleep(args.minutes * 60)
         try:
-            realtime_quote = get_realtime_quote(ticker)
+            refresh_snapshot()
         except Exception as e:
-            log.exception(f"Error getting realtime data for {ticker}: {e}")
-            continue
-        data_df = data[ticker].copy()
+            log.exception(f"Error refreshing data snapshot: {e}")
 
-        # appends realtime quote to existing interal data structure
-        data_df.loc[data_df.shape[0], ("datetime", "price")] = (
-            realtime_quote["datetime"],
-            realtime_quote["price"],
-        )
-        data_df["datetime"] = pd.to_datetime(data_df["datetime"])
-        data_df = calculate_avg_and_sigma(data_df, interval=args.minutes)
-        data_df = calculate_signal_and_pnl(data_df)
-        result[ticker] = data_df
 
-    return result
+def output_json(data, code, headers=None):
+    """Flask-RESTful JSON representation that serializes responses with orjson
+
+    Args:
+        data (Any): Response data returned by the resource
+        code (int): HTTP status code
+        headers (dict, optional): Additional response headers. Defaults to None.
+
+    Returns:
+        Response: Flask response with a JSON encoded body
+    """
+    resp = make_response(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY), code)
+    resp.headers.extend(headers or {})
+    return resp
 
 
 def main(port: int):
@@ -129,14 +198,23 @@ def main(port: int):
     app = Flask(__name__)
 
     api = Api(app)
+    api.representation("application/json")(output_json)
     api.add_resource(HomePage, "/")
     api.add_resource(Data, "/data/<query_time>")
     api.add_resource(AddTicker, "/add_ticker/<ticker>")
     api.add_resource(DeleteTicker, "/del_ticker/<ticker>")
     api.add_resource(Report, "/report")
 
+    threading.Thread(target=snapshot_refresher, daemon=True).start()
+
     log.info("Trading server started...accepting requests from client")
-    serve(app, listen=f"*:{args.port}")
+    serve(
+        app,
+        listen=f"*:{args.port}",
+        threads=32,
+        connection_limit=1024,
+        channel_timeout=60,
+    )
 
 
 def server_start_up_tasks(tickers: list[str]):
@@ -145,14 +223,20 @@ def server_start_up_tasks(tickers: list[str]):
     - add historical data from list of tickers provided
     - computes 24 hour rolling moving avg and sigma for each ticker
     - computes signal and pnl for each ticker
+    - builds the initial data snapshot with the latest realtime quotes
     """
     for ticker in tickers:
-        data[ticker] = add_ticker(
+        data_df = add_ticker(
             ticker=ticker,
             interval=args.minutes,
         )
+        if data_df.empty:
+            log.error("Error adding %s to server data", ticker)
+            continue
+        data[ticker] = data_df
 
     save_report(data)
+    refresh_snapshot()
 
     log.info("Server startup tasks completed")
 
@@ -161,9 +245,9 @@ def at_keyboard_interrupt():
     sys.exit(0)
 
 
-atexit.register(at_keyboard_interrupt)
-
 if __name__ == "__main__":
+    atexit.register(at_keyboard_interrupt)
+
     parser = argparse.ArgumentParser(description="Process arguments when server starts")
 
     parser.add_argument(
@@ -195,7 +279,6 @@ if __name__ == "__main__":
     args.tickers = [ticker.upper() for ticker in args.tickers]
 
     try:
-        data: dict[str, pd.DataFrame] = {}
         server_start_up_tasks(args.tickers)
         main(args.port)
     except KeyboardInterrupt:
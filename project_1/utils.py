@@ -1,12 +1,20 @@
+import os
+import tempfile
+import time
 from configparser import ConfigParser
 from datetime import datetime
 from pathlib import Path
 from typing import Any
+from zoneinfo import ZoneInfo
 
 import finnhub
+import numpy as np
+import orjson
 import pandas as pd
 import requests
 from logger import log
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 # Loads the config file for API keys
 config = ConfigParser()
@@ -16,10 +24,91 @@ config.read(Path(__file__).parent / "config.txt")
 ALPHA_VANTAGE_API_KEY = config["API_KEYS"]["ALPHA_VANTAGE_API_KEY"]
 FINNHUB_API_KEY = config["API_KEYS"]["FINNHUB_API_KEY"]
 
+# Alpha Vantage bars are naive US/Eastern wall times; realtime quotes are stamped to match
+EXCHANGE_TIMEZONE = ZoneInfo("America/New_York")
+
+
+def create_http_adapter() -> HTTPAdapter:
+    """Creates the pooled, retrying adapter mounted on the shared HTTP sessions.
+    The pool is larger than the 16 worker threads that fetch realtime quotes.
+
+    Returns:
+        HTTPAdapter: Adapter for https:// URLs
+    """
+    return HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(total=2, backoff_factor=0.3),
+    )
+
+
+# Shared HTTP clients so repeated requests reuse pooled keep-alive connections
+session = requests.Session()
+session.mount("https://", create_http_adapter())
+finnhub_client = finnhub.Client(api_key=FINNHUB_API_KEY)
+# finnhub.Client makes its own requests.Session with default adapters
+finnhub_client._session.mount("https://", create_http_adapter())
+
+
+def get_cache_path(ticker: str, interval: int) -> Path:
+    """Path of the on-disk cache of Alpha Vantage historical data for ticker and interval
+
+    Args:
+        ticker (str): The ticker symbol of the stock or asset.
+        interval (int): The time interval for the historical data in minutes.
+
+    Returns:
+        Path: Path to the cached parquet file
+    """
+    return Path(f"data/cache/{ticker}_{interval}.parquet")
+
+
+def read_cached_historical_data(
+    cache_path: Path, max_age: float
+) -> pd.DataFrame | None:
+    """Reads cached historical data if the cache file is younger than max_age seconds
+
+    Args:
+        cache_path (Path): Path to the cached parquet file
+        max_age (float): Maximum age of the cache file in seconds
+
+    Returns:
+        pd.DataFrame or None: Cached data, or None if the cache is missing, stale or unreadable
+    """
+    try:
+        if time.time() - cache_path.stat().st_mtime >= max_age:
+            return None
+        return pd.read_parquet(cache_path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.warning(f"Ignoring unreadable cache file {cache_path}: {e}")
+        return None
+
+
+def write_cached_historical_data(data_df: pd.DataFrame, cache_path: Path):
+    """Writes historical data to the cache. The file is written to a temporary path and
+    moved into place so a reader never sees a partially written file.
+
+    Args:
+        data_df (pd.DataFrame): Historical data to cache
+        cache_path (Path): Path to the cached parquet file
+    """
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        data_df.to_parquet(tmp_name, compression="zstd")
+        os.replace(tmp_name, cache_path)
+    except Exception as e:
+        log.warning(f"Unable to write cache file {cache_path}: {e}")
+        Path(tmp_name).unlink(missing_ok=True)
+
 
 def get_alpha_vantage_historical_data(ticker: str, interval: int) -> pd.DataFrame:
     """
     Retrieves historical data from the Alpha Vantage API for a given ticker symbol and interval.
+    Data cached on disk less than one interval ago is returned without calling the API.
 
     Args:
         ticker (str): The ticker symbol of the stock or asset.
@@ -29,6 +118,12 @@ def get_alpha_vantage_historical_data(ticker: str, interval: int) -> pd.DataFram
         pd.DataFrame: A DataFrame containing the historical data with columns 'datetime' and 'price',
                       sorted by datetime in ascending order.
     """
+    cache_path = get_cache_path(ticker, interval)
+    cached_df = read_cached_historical_data(cache_path, max_age=interval * 60)
+    if cached_df is not None:
+        log.info("Loading cached historical data for %s", ticker)
+        return cached_df
+
     log.info("Getting historical data from Alpha Vantage API for %s", ticker)
 
     alpha_vantage_url = "https://www.alphavantage.co/query?"
@@ -41,7 +136,7 @@ def get_alpha_vantage_historical_data(ticker: str, interval: int) -> pd.DataFram
         "apikey": ALPHA_VANTAGE_API_KEY,
     }
 
-    resp = requests.get(alpha_vantage_url, params=params)
+    resp = session.get(alpha_vantage_url, params=params, timeout=30)
     if resp.status_code == 200 and "Invalid API call" in resp.text:
         log.error(f"Invalid API call: {resp.text}")
         return pd.DataFrame()
@@ -57,21 +152,22 @@ def get_alpha_vantage_historical_data(ticker: str, interval: int) -> pd.DataFram
         log.error(f"Server error: {resp.text}")
         return pd.DataFrame()
 
-    data = resp.json()[f"Time Series ({interval}min)"]
-    data_df = pd.DataFrame(data).T
-
-    data_df.index = data_df.index.astype("datetime64[ns]")
-
-    data_df = data_df.rename(columns={"4. close": "price"})
-    data_df["price"] = data_df["price"].astype(float)
-    data_df = data_df.reset_index().rename(columns={"index": "datetime"})
+    data = orjson.loads(resp.content)[f"Time Series ({interval}min)"]
+    data_df = pd.DataFrame(
+        [
+            (timestamp, round(float(bar["4. close"]), 2))
+            for timestamp, bar in data.items()
+        ],
+        columns=["datetime", "price"],
+    )
+    data_df["datetime"] = pd.to_datetime(
+        data_df["datetime"], format="%Y-%m-%d %H:%M:%S"
+    )
+    data_df = data_df.sort_values("datetime", kind="mergesort", ignore_index=True)
 
-    data_df["price"] = data_df["price"].apply(lambda x: round(x, 2))
-    data_df = data_df[["datetime", "price"]]
-    return data_df.sort_values(
-        "datetime",
-        ascending=True,
-    ).reset_index(drop=True)
+    if not data_df.empty:
+        write_cached_historical_data(data_df, cache_path)
+    return data_df
 
 
 def get_realtime_quote(ticker: str) -> dict[str, Any]:
@@ -83,18 +179,56 @@ def get_realtime_quote(ticker: str) -> dict[str, Any]:
 
     Returns:
         dict[str, Any]: A dictionary containing the real-time quote information.
-            - "datetime": The date and time of the quote.
+            - "datetime": The date and time of the quote as naive US/Eastern wall time,
+              matching the Alpha Vantage bars.
             - "price": The current price of the stock.
 
     """
-    finnhub_client = finnhub.Client(api_key=FINNHUB_API_KEY)
     quote = finnhub_client.quote(ticker.upper())
     return {
-        "datetime": datetime.fromtimestamp(quote["t"]),
+        "datetime": datetime.fromtimestamp(quote["t"], EXCHANGE_TIMEZONE).replace(
+            tzinfo=None
+        ),
         "price": quote["c"],
     }
 
 
+def signal_pnl_kernel(
+    price: np.ndarray, s_avg: np.ndarray, sigma: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Computes signal, position and pnl from plain float64 arrays.
+    Kept free of pandas so a path-dependent version can be compiled with numba.njit.
+
+    Args:
+        price (np.ndarray): Prices
+        s_avg (np.ndarray): Rolling average prices
+        sigma (np.ndarray): Rolling standard deviations
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: signal, position and pnl arrays
+    """
+    n = len(price)
+
+    # signal at i drives the position at i + 1; the first and last rows stay flat
+    signal = np.zeros(n)
+    signal[1:-1] = np.where(
+        price[1:-1] > s_avg[1:-1] + sigma[1:-1],
+        1.0,
+        np.where(price[1:-1] < s_avg[1:-1] - sigma[1:-1], -1.0, 0.0),
+    )
+
+    # position is in dollar value, not number of shares
+    delta = np.zeros(n)
+    delta[:-1] = signal[:-1] * price[1:]
+    position = np.zeros(n)
+    position[1:] = np.cumsum(delta)[:-1]
+
+    pnl = np.zeros(n)
+    pnl[1:] = np.round(position[:-1] * (price[1:] / price[:-1] - 1), 2)
+
+    return signal, position, pnl
+
+
 def calculate_signal_and_pnl(df: pd.DataFrame) -> pd.DataFrame:
     """Calculates the signal, pnl and position for the DataFrame provided
 
@@ -104,35 +238,16 @@ def calculate_signal_and_pnl(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         df (DataFrame): Return modified DataFrame with signal, pnl and position
     """
-    df["signal"] = 0.0
-    df["pnl"] = 0.0
-    df["position"] = 0.0
-    position = 0.0  # position is in dollar value, not number of shares
-    for i in range(1, len(df) - 1):
-        current_price = df.iloc[i]["price"]
-        avg_price = df.iloc[i]["S_avg"]
-        sigma = df.iloc[i]["sigma"]
-        next_price = df.iloc[i + 1]["price"]
-
-        if current_price > (avg_price + sigma):
-            df.loc[i, "signal"] = 1
-            position += next_price
-            df.loc[i + 1, "position"] = position
-        elif current_price < (avg_price - sigma):
-            df.loc[i, "signal"] = -1
-            position -= next_price
-            df.loc[i + 1, "position"] = position
-        else:
-            df.loc[i, "signal"] = 0
-            df.loc[i + 1, "position"] = position
-
-    for i in range(1, len(df)):
-        previous_position = df.iloc[i - 1]["position"]
-        current_price = df.iloc[i]["price"]
-        previous_price = df.iloc[i - 1]["price"]
-        pnl = previous_position * ((current_price / previous_price) - 1)
-        df.loc[i, "pnl"] = round(pnl, 2)
-
+    # per-column to_numpy returns views of the float64 columns, and the results are
+    # written back in place, so the frame is never copied
+    signal, position, pnl = signal_pnl_kernel(
+        df["price"].to_numpy(dtype=float),
+        df["S_avg"].to_numpy(dtype=float),
+        df["sigma"].to_numpy(dtype=float),
+    )
+    df["signal"] = signal
+    df["pnl"] = pnl
+    df["position"] = position
     return df
 
 
@@ -147,8 +262,9 @@ def calculate_avg_and_sigma(df, interval):
         df (DataFrame): Return modified DataFrmae with avg price and sigma
     """
     window = 24 * 60 // interval
-    df["S_avg"] = df["price"].rolling(window=window).mean().apply(lambda x: round(x, 2))
-    df["sigma"] = df["price"].rolling(window=window).std()
+    rolling = df["price"].rolling(window=window)
+    df["S_avg"] = rolling.mean().round(2)
+    df["sigma"] = rolling.std()
     return df
 
 
@@ -171,36 +287,49 @@ def add_ticker(ticker, interval):
     return calculate_signal_and_pnl(data_df)
 
 
-def get_price(df, query_datetime) -> float | None:
-    """Gets price for ticker at given query time
+def append_realtime_quote(df, realtime_quote) -> pd.DataFrame:
+    """Appends the realtime quote to the datetime and price history of a ticker.
+    As a safety net, a quote older than the last bar is dropped so the datetime column
+    stays sorted.
 
     Args:
-        df (DataFrame): pandas DataFrame with datetime, price
-        query_datetime (str): Datetime in YYYY-MM-DD-HH:MM format
+        df (DataFrame): pandas DataFrame with datetime and price, sorted by datetime
+        realtime_quote (dict[str, Any]): Quote with datetime and price
 
     Returns:
-        float or str: Returns price or No Data
+        df (DataFrame): New DataFrame with datetime and price only
     """
-    price = df.loc[(df["datetime"] <= query_datetime)].tail(1)["price"].values
-    if len(price) == 1:
-        return price[0]
-    return None
+    history_df = df[["datetime", "price"]]
+    quote_datetime = pd.Timestamp(realtime_quote["datetime"])
+    if not history_df.empty and quote_datetime < history_df["datetime"].iat[-1]:
+        log.warning(
+            "Dropping realtime quote at %s, older than the last bar at %s",
+            quote_datetime,
+            history_df["datetime"].iat[-1],
+        )
+        return history_df.copy()
+
+    quote_df = pd.DataFrame(
+        {"datetime": [quote_datetime], "price": [realtime_quote["price"]]}
+    ).astype(history_df.dtypes)
+    return pd.concat([history_df, quote_df], ignore_index=True)
 
 
-def get_signal(df, query_datetime) -> int | None:
-    """Gets signal for ticker at given query time
+def get_price_and_signal(df, query_datetime) -> tuple[float | None, int | None]:
+    """Gets price and signal for ticker at given query time
 
     Args:
-        df (DataFrame): pandas DataFrame with datetime, price
-        query_datetime (str): Datetime in YYYY-MM-DD-HH:MM format
+        df (DataFrame): pandas DataFrame with datetime, price and signal, sorted by datetime
+        query_datetime (datetime): Query datetime
 
     Returns:
-        int or str: Returns signal or No Data
+        tuple[float | None, int | None]: Returns price and signal of the latest row at or
+            before query_datetime, or (None, None) if there is no such row
     """
-    signal = df.loc[(df["datetime"] <= query_datetime)].tail(1)["signal"].values
-    if len(signal) == 1:
-        return int(signal[0])
-    return None
+    i = df["datetime"].searchsorted(query_datetime, side="right") - 1
+    if i < 0:
+        return None, None
+    return float(df["price"].iat[i]), int(df["signal"].iat[i])
 
 
 def save_report(data: dict[str, pd.DataFrame]):
@@ -213,16 +342,12 @@ def save_report(data: dict[str, pd.DataFrame]):
     Returns:
         None
     """
-    report_df = pd.DataFrame()
-    for ticker in data:
-        data_df = data[ticker][["datetime", "price", "signal", "pnl"]].copy()
-        data_df["ticker"] = ticker
-        data_df = data_df[["datetime", "ticker", "price", "signal", "pnl"]]
-
-        report_df = pd.concat([report_df, data_df])
-
-    report_df = report_df.sort_values(
-        ["datetime", "ticker"],
-        ascending=True,
-    ).reset_index(drop=True)
-    report_df.to_csv("data/report.csv", index=False)
+    columns = ["datetime", "ticker", "price", "signal", "pnl"]
+    frames = [data[ticker].assign(ticker=ticker)[columns] for ticker in data]
+    report_df = (
+        pd.concat(frames, ignore_index=True)
+        if frames
+        else pd.DataFrame(columns=columns)
+    )
+    report_df.sort_values(["datetime", "ticker"], ignore_index=True, inplace=True)
+    report_df.to_csv("data/report.csv", index=False, lineterminator="\n")
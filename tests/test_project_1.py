@@ -1,14 +1,28 @@
+import time
 from datetime import datetime
 
-from utils import get_alpha_vantage_historical_data, get_realtime_quote
+import pandas as pd
+import utils
+from client import is_valid_server_address
+from utils import (
+    append_realtime_quote,
+    calculate_signal_and_pnl,
+    get_alpha_vantage_historical_data,
+    get_price_and_signal,
+    get_realtime_quote,
+)
 
 
-def test_get_alpha_vantage_historical_data():
+def test_get_alpha_vantage_historical_data(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        utils, "get_cache_path", lambda ticker, interval: tmp_path / "cache.parquet"
+    )
     df = get_alpha_vantage_historical_data("AAPL", 60)
 
     assert df.size > 0
     assert "datetime" in df.columns
     assert "price" in df.columns
+    assert (tmp_path / "cache.parquet").exists()
 
     # df = get_alpha_vantage_historical_data("AAPL", 13434)
     # assert df.empty
@@ -17,9 +31,145 @@ def test_get_alpha_vantage_historical_data():
     # assert df.empty
 
 
+def test_get_alpha_vantage_historical_data_from_cache(monkeypatch, tmp_path):
+    cache_path = tmp_path / "cache" / "AAPL_60.parquet"
+    monkeypatch.setattr(utils, "get_cache_path", lambda ticker, interval: cache_path)
+
+    def get(*args, **kwargs):
+        raise AssertionError("cached data should not be requested from the API")
+
+    monkeypatch.setattr(utils.session, "get", get)
+    df = pd.DataFrame(
+        {
+            "datetime": pd.date_range("2024-03-01 09:30", periods=3, freq="60min"),
+            "price": [10.0, 11.0, 12.0],
+        }
+    )
+    utils.write_cached_historical_data(df, cache_path)
+
+    assert list(cache_path.parent.iterdir()) == [cache_path]
+    pd.testing.assert_frame_equal(get_alpha_vantage_historical_data("AAPL", 60), df)
+
+    # a truncated cache file is treated as a cache miss
+    cache_path.write_bytes(b"PAR1")
+    assert utils.read_cached_historical_data(cache_path, max_age=3600) is None
+
+
 def test_get_realtime_quote():
     data = get_realtime_quote("AAPL")
 
     assert data is not None
     assert isinstance(data["price"], float)
     assert isinstance(data["datetime"], datetime)
+
+
+def test_get_realtime_quote_exchange_time(monkeypatch):
+    # 2024-03-01 18:02 UTC is 13:02 in New York whatever the server time zone is
+    monkeypatch.setattr(
+        utils.finnhub_client, "quote", lambda ticker: {"t": 1709316120, "c": 180.5}
+    )
+    for tz in ["America/Los_Angeles", "UTC", "Asia/Tokyo"]:
+        monkeypatch.setenv("TZ", tz)
+        time.tzset()
+        assert get_realtime_quote("AAPL")["datetime"] == datetime(2024, 3, 1, 13, 2)
+
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_calculate_signal_and_pnl():
+    df = pd.DataFrame(
+        {
+            "price": [10.0, 12.0, 11.0, 8.0, 10.0],
+            "S_avg": [10.0] * 5,
+            "sigma": [1.0] * 5,
+        }
+    )
+    df = calculate_signal_and_pnl(df)
+
+    assert df["signal"].tolist() == [0, 1, 0, -1, 0]
+    assert df["position"].tolist() == [0, 0, 11, 11, 1]
+    assert df["pnl"].tolist() == [0, 0, 0, -3, 2.75]
+
+
+def test_is_valid_server_address():
+    assert is_valid_server_address("127.0.0.1:8000")
+    assert not is_valid_server_address("127a0b0c1:8000")
+    assert not is_valid_server_address("256.0.0.1:8000")
+    assert not is_valid_server_address("127.0.0.1:0")
+    assert not is_valid_server_address("127.0.0.1")
+
+
+def test_get_price_and_signal():
+    df = pd.DataFrame(
+        {
+            "datetime": pd.date_range("2024-03-01 09:30", periods=3, freq="5min"),
+            "price": [10.0, 11.0, 12.0],
+            "signal": [0.0, 1.0, -1.0],
+        }
+    )
+
+    assert get_price_and_signal(df, datetime(2024, 3, 1, 9, 0)) == (None, None)
+    assert get_price_and_signal(df, datetime(2024, 3, 1, 9, 35)) == (11.0, 1)
+    assert get_price_and_signal(df, datetime(2024, 3, 1, 9, 37)) == (11.0, 1)
+    assert get_price_and_signal(df, datetime(2024, 3, 2)) == (12.0, -1)
+
+
+def test_append_realtime_quote():
+    df = pd.DataFrame(
+        {
+            "datetime": pd.date_range("2024-03-01 15:50", periods=2, freq="5min"),
+            "price": [10.0, 11.0],
+            "signal": [0.0, 0.0],
+        }
+    )
+
+    df_new = append_realtime_quote(
+        df, {"datetime": datetime(2024, 3, 1, 16, 1), "price": 12}
+    )
+    assert df_new.columns.tolist() == ["datetime", "price"]
+    assert df_new["price"].tolist() == [10.0, 11.0, 12.0]
+    assert df_new["datetime"].dtype == df["datetime"].dtype
+
+    # a quote timestamped before the last bar is dropped so lookups stay sorted
+    df_old = append_realtime_quote(
+        df, {"datetime": datetime(2024, 3, 1, 13, 0), "price": 9.0}
+    )
+    assert df_old["price"].tolist() == [10.0, 11.0]
+    assert df_old["datetime"].is_monotonic_increasing
+    assert get_price_and_signal(
+        calculate_signal_and_pnl(df_old.assign(S_avg=10.0, sigma=1.0)),
+        datetime(2024, 3, 1, 16, 30),
+    ) == (11.0, 0)
+
+
+def test_refresh_snapshot(monkeypatch, tmp_path):
+    # server creates its data/ and logs/ folders in the working directory on import
+    monkeypatch.chdir(tmp_path)
+    import server
+
+    aapl, msft, goog = pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    aapl_latest, tsla_latest, msft_previous, tsla_previous = (
+        pd.DataFrame(),
+        pd.DataFrame(),
+        pd.DataFrame(),
+        pd.DataFrame(),
+    )
+    monkeypatch.setattr(server, "data", {"AAPL": aapl, "MSFT": msft, "GOOG": goog})
+    monkeypatch.setattr(
+        server, "snapshot", {"MSFT": msft_previous, "TSLA": tsla_previous}
+    )
+    monkeypatch.setattr(
+        server, "get_latest_data", lambda: {"AAPL": aapl_latest, "TSLA": tsla_latest}
+    )
+
+    server.refresh_snapshot()
+    snapshot = server.get_snapshot()
+
+    assert sorted(snapshot) == ["AAPL", "GOOG", "MSFT"]
+    # refreshed ticker
+    assert snapshot["AAPL"] is aapl_latest
+    # failed quote keeps the previous entry
+    assert snapshot["MSFT"] is msft_previous
+    # added ticker without a quote yet is served from its history
+    assert snapshot["GOOG"] is goog